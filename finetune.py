@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import contextlib
 import os
+import sys
 from pathlib import Path
 
 import torch
 from datasets import load_dataset
-from peft import LoraConfig, TaskType
-from transformers import AutoModelForCausalLM, AutoTokenizer, TrainingArguments
+from peft import LoraConfig, TaskType, prepare_model_for_kbit_training
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig, TrainingArguments
 from trl import SFTTrainer, SFTConfig
 
 
 def main() -> None:
+    # Seed once for reproducibility, but keep non-deterministic algorithms so cuDNN can pick the fastest kernels
+    seed = 42
+    torch.manual_seed(seed)
+
+    # Allow TF32 tensor-core matmuls on Ampere+ CUDA (no-op elsewhere) and let cuDNN autotune kernels
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.set_float32_matmul_precision("high")
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cudnn.deterministic = False
+
     # Model configuration
     model_id = "microsoft/phi-3-mini-4k-instruct"
 
@@ -19,10 +32,24 @@ def main() -> None:
     use_mps = getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available()
     bf16_supported = use_cuda and hasattr(torch.cuda, "is_bf16_supported") and torch.cuda.is_bf16_supported()
 
+    # Probe MPS bf16 autocast (M2+ hardware, recent torch); older setups keep fp16 weights
+    mps_bf16_autocast = False
+    if use_mps:
+        try:
+            torch.zeros(1, dtype=torch.bfloat16, device="mps")
+            mps_bf16_autocast = torch.amp.is_autocast_available("mps")
+        except (AttributeError, RuntimeError, TypeError):
+            mps_bf16_autocast = False
+
     if bf16_supported:
         chosen_dtype = torch.bfloat16
         training_precision = {"bf16": True, "fp16": False}
         precision_note = "Using bfloat16 on CUDA"
+    elif mps_bf16_autocast:
+        chosen_dtype = torch.float32
+        # Trainer AMP flags are unsupported on MPS; bf16 autocast is entered around trainer.train() instead
+        training_precision = {"bf16": False, "fp16": False}
+        precision_note = "Using float32 weights with bfloat16 autocast on Apple MPS"
     elif use_mps:
         chosen_dtype = torch.float16
         # Transformers mixed-precision flags (fp16/bf16) are not supported on MPS. Keep them False.
@@ -36,22 +63,79 @@ def main() -> None:
     device = "cuda" if use_cuda else ("mps" if use_mps else "cpu")
     print(f"[finetune] {precision_note} | device={device}")
 
+    # Attention kernel: FlashAttention-2 on bf16-capable (Ampere+) CUDA when installed, fused SDPA otherwise;
+    # eager only on CPU. FA2 supports neither fp32 nor pre-Ampere GPUs, where chosen_dtype falls back to float32.
+    if use_cuda and bf16_supported:
+        try:
+            import flash_attn  # noqa: F401
+
+            attn_implementation = "flash_attention_2"
+        except ImportError:
+            attn_implementation = "sdpa"
+    elif use_cuda or use_mps:
+        attn_implementation = "sdpa"
+    else:
+        attn_implementation = "eager"
+    print(f"[finetune] attn_implementation={attn_implementation}")
+
     # Tokenizer
-    tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
     if tokenizer.pad_token is None:
         tokenizer.pad_token = tokenizer.eos_token
 
-    # Model (no 4-bit quantization on Mac). Avoid device_map to prevent meta/offload issues with Trainer.
-    model = AutoModelForCausalLM.from_pretrained(
-        model_id,
-        torch_dtype=chosen_dtype,
-        low_cpu_mem_usage=False,
-        attn_implementation="eager",
-        trust_remote_code=True,
-    )
+    # 4-bit NF4 base weights (QLoRA) on CUDA when bitsandbytes is available; full weights elsewhere
+    quantization_config = None
+    if use_cuda:
+        try:
+            import bitsandbytes  # noqa: F401
 
-    # Place the model explicitly
-    model = model.to(device)
+            quantization_config = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_compute_dtype=chosen_dtype if bf16_supported else torch.float16,
+                bnb_4bit_use_double_quant=True,
+            )
+        except ImportError:
+            print("[finetune] bitsandbytes not installed; loading full-precision weights")
+
+    # Model (no 4-bit quantization on Mac). Avoid multi-device device_map to prevent meta/offload issues with Trainer.
+    if quantization_config is not None:
+        # bitsandbytes handles placement; pin every module to the current GPU
+        model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            torch_dtype=chosen_dtype,
+            quantization_config=quantization_config,
+            use_safetensors=True,
+            device_map={"": torch.cuda.current_device()},
+            attn_implementation=attn_implementation,
+        )
+        # Casts norms to fp32, enables input grads and gradient checkpointing for k-bit training
+        model = prepare_model_for_kbit_training(
+            model,
+            use_gradient_checkpointing=True,
+            gradient_checkpointing_kwargs={"use_reentrant": False},
+        )
+    else:
+        model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            torch_dtype=chosen_dtype,
+            # Stream safetensors shards straight into the target dtype (mmap, no full host copy)
+            low_cpu_mem_usage=True,
+            use_safetensors=True,
+            attn_implementation=attn_implementation,
+        )
+
+        # Place the model explicitly
+        model = model.to(device)
+
+        # Recompute activations in backward instead of keeping them live for every layer.
+        # Input grads are required so LoRA adapters still receive gradients through checkpoints.
+        model.gradient_checkpointing_enable(gradient_checkpointing_kwargs={"use_reentrant": False})
+        model.enable_input_require_grads()
+
+    # Phi-3 is native in transformers >= 4.41; remote modeling code would bypass the fused SDPA/flash/compile paths
+    if not type(model).__module__.startswith("transformers.models.phi3"):
+        print(f"[finetune] Warning: expected native Phi-3 modeling, got {type(model).__module__}", file=sys.stderr)
 
     # Disable KV cache during training to avoid DynamicCache API mismatches
     model.config.use_cache = False
@@ -60,20 +144,42 @@ def main() -> None:
     if getattr(model.config, "pad_token_id", None) is None:
         model.config.pad_token_id = tokenizer.pad_token_id
 
-    # LoRA configuration (QLoRA-style target modules, but without 4-bit quantization on Mac)
+    # LoRA configuration (QLoRA on CUDA; plain LoRA over full weights on Mac/CPU).
+    # Phi-3 fuses query/key/value into a single qkv_proj (3072 -> 9216). At r=4 that is 4 * (3072 + 9216) * 32 layers
+    # ~= 1.6M trainable params, half of the previous effective set (o_proj at r=16, ~3.1M; the other names never
+    # matched Phi-3 modules). rsLoRA scales by alpha/sqrt(r): alpha=4 keeps the old alpha/r = 2 update scale,
+    # so learning_rate stays unchanged.
+    lora_target_modules = ["qkv_proj"]
     lora_config = LoraConfig(
-        r=16,
-        lora_alpha=32,
+        r=4,
+        lora_alpha=4,
         lora_dropout=0.05,
         task_type=TaskType.CAUSAL_LM,
-        target_modules=["q_proj", "k_proj", "v_proj", "o_proj", "dense"],
+        target_modules=lora_target_modules,
+        use_rslora=True,
         bias="none",
     )
 
-    # Formatting function: format each example into the Phi-3 chat template
-    def format_prompt(example: dict) -> str:
-        # Formats a single example into the Phi-3 chat template
-        return f"<|user|>\n{example['instruction']}<|end|>\n<|assistant|>\n{example['output']}"
+    # Cap packed/truncated sequences well below Phi-3's 4k context; dataset rows are far shorter
+    max_seq_length = 1024
+
+    # Encoding function: render a batch of examples with the tokenizer's Phi-3 chat template and tokenize once,
+    # so SFTTrainer receives input_ids directly (the template already terminates each sample with EOS)
+    def encode_chat(batch: dict[str, list[str]]) -> dict[str, list[list[int]]]:
+        conversations = [
+            [{"role": "user", "content": instruction}, {"role": "assistant", "content": output}]
+            for instruction, output in zip(batch["instruction"], batch["output"])
+        ]
+        encoded = tokenizer.apply_chat_template(
+            conversations,
+            tokenize=True,
+            add_generation_prompt=False,
+            padding=False,
+            truncation=True,
+            max_length=max_seq_length,
+            return_dict=True,
+        )
+        return {"input_ids": encoded["input_ids"], "attention_mask": encoded["attention_mask"]}
 
     # Dataset: use the generated JSONL file at the repo root
     repo_root = Path(__file__).resolve().parent
@@ -81,35 +187,68 @@ def main() -> None:
     if not data_path.exists():
         raise FileNotFoundError(f"Dataset not found at {data_path}")
 
-    # Load raw dataset and map to formatted text field
-    raw_dataset = load_dataset("json", data_files=str(data_path), split="train")
-    formatted_dataset = raw_dataset.map(lambda example: {"text": format_prompt(example)})
+    # Large JSONL files are streamed instead of being materialized into the Arrow cache up front
+    stream_dataset = data_path.stat().st_size > 256 * 1024 * 1024
+    # In-memory maps run in parallel and are reused from the datasets cache on re-runs
+    # (IterableDataset.map supports neither num_proc nor cache files)
+    map_kwargs = {} if stream_dataset else {"num_proc": os.cpu_count(), "load_from_cache_file": True}
+
+    # Load raw dataset and tokenize it through the chat template
+    raw_dataset = load_dataset("json", data_files=str(data_path), split="train", streaming=stream_dataset)
+    tokenized_dataset = raw_dataset.map(
+        encode_chat, batched=True, batch_size=1000, remove_columns=["instruction", "output"], **map_kwargs
+    )
+    if stream_dataset:
+        tokenized_dataset = tokenized_dataset.shuffle(buffer_size=1000, seed=seed)
 
     # Training arguments
     output_dir = str(repo_root / "phi3-powershell-adapters")
     # Prefer no packing on Apple MPS to avoid attention impl issues
     packing_flag = False if use_mps else True
+    # Paged 8-bit AdamW alongside QLoRA, a single fused AdamW kernel on plain CUDA, default AdamW elsewhere
+    if quantization_config is not None:
+        optim_name = "paged_adamw_8bit"
+    elif use_cuda:
+        optim_name = "adamw_torch_fused"
+    else:
+        optim_name = "adamw_torch"
+    # Prepare batches in background workers; pinned host memory enables async H2D copies on CUDA
+    dataloader_workers = min(8, (os.cpu_count() or 1) // 2)
+    # torch.compile the LoRA-wrapped model for fused kernels; inductor is CUDA-only here (skip MPS/CPU)
+    torch_version = tuple(int(part) for part in torch.__version__.split("+")[0].split(".")[:2])
+    use_torch_compile = use_cuda and torch_version >= (2, 1)
 
     sft_args = SFTConfig(
         output_dir=output_dir,
         num_train_epochs=8,
-        per_device_train_batch_size=1,
-        gradient_accumulation_steps=4,
+        # Same effective batch as bs=1 x accum=4 with a quarter of the step invocations (try bs=2 x accum=2 on OOM)
+        per_device_train_batch_size=4,
+        gradient_accumulation_steps=1,
+        gradient_checkpointing=True,
+        gradient_checkpointing_kwargs={"use_reentrant": False},
+        optim=optim_name,
         learning_rate=2e-4,
         lr_scheduler_type="cosine",
         warmup_ratio=0.1,
         logging_steps=10,
+        # Single mid-run snapshot for resilience; the final adapter is saved explicitly after training
         save_strategy="steps",
-        save_steps=10,
-        save_total_limit=3,
+        save_steps=25,
+        save_total_limit=1,
         bf16=training_precision["bf16"],
         fp16=training_precision["fp16"],
         report_to=[],
         push_to_hub=False,
-        dataset_text_field="text",
         packing=packing_flag,
-        dataloader_num_workers=0,
+        max_length=max_seq_length,
+        dataloader_num_workers=dataloader_workers,
+        dataloader_pin_memory=use_cuda,
+        dataloader_persistent_workers=dataloader_workers > 0,
         max_steps=50,
+        seed=seed,
+        full_determinism=False,
+        torch_compile=use_torch_compile,
+        torch_compile_mode="reduce-overhead" if use_torch_compile else None,
     )
 
     # Trainer: supervise on the 'output' field as requested
@@ -117,17 +256,21 @@ def main() -> None:
         model=model,
         processing_class=tokenizer,
         peft_config=lora_config,
-        train_dataset=formatted_dataset,
+        train_dataset=tokenized_dataset,
         args=sft_args,
     )
 
-    # Train
-    trainer.train()
+    # Start from a clean CUDA allocator state after model loading
+    if use_cuda:
+        torch.cuda.empty_cache()
+
+    # Train (matmuls autocast to bf16 on MPS when supported)
+    autocast_ctx = torch.autocast("mps", dtype=torch.bfloat16) if mps_bf16_autocast else contextlib.nullcontext()
+    with autocast_ctx:
+        trainer.train()
 
-    # Save final adapter model
-    os.makedirs(output_dir, exist_ok=True)
+    # Save final adapter model (save_model writes the PEFT adapter + config and creates the directory)
     trainer.save_model(output_dir)
-    trainer.model.save_pretrained(output_dir)
     tokenizer.save_pretrained(output_dir)
 
 
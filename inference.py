@@ -1,16 +1,48 @@
 from __future__ import annotations
 
+import argparse
+import os
+import shutil
 import sys
+import threading
 from pathlib import Path
+from typing import Literal
 
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, TextStreamer
+import transformers
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    BitsAndBytesConfig,
+    CompileConfig,
+    StaticCache,
+    TextStreamer,
+)
+from transformers.models.phi3.modeling_phi3 import Phi3RotaryEmbedding
 from peft import PeftModel
 
+try:
+    from prompt_toolkit import PromptSession
+except ImportError:  # Optional: line editing/history in the REPL; plain input() otherwise
+    PromptSession = None
 
-def load_model_and_tokenizer() -> tuple[AutoModelForCausalLM, AutoTokenizer, str]:
+# Fixed Phi-3 chat scaffolding around each instruction
+PHI3_USER_PREFIX = "<|user|>\n"
+PHI3_ASSISTANT_PREFIX = "<|end|>\n<|assistant|>\n"
+
+
+def load_model_and_tokenizer(
+    quantize: Literal["none", "nf4", "int8"] = "none",
+) -> tuple[AutoModelForCausalLM, AutoTokenizer, str, StaticCache]:
     base_model_id = "microsoft/phi-3-mini-4k-instruct"
     adapters_dir = Path(__file__).resolve().parent / "phi3-powershell-adapters"
+    merged_dir = Path(__file__).resolve().parent / "phi3-powershell-merged"
+
+    # greedy_generate() calls PreTrainedModel.get_compiled_call() and forward(logits_to_keep=...), both added in
+    # transformers 4.50 (the adapters were trained on 4.55)
+    transformers_version = tuple(int(part) for part in transformers.__version__.split(".")[:2])
+    if transformers_version < (4, 50):
+        raise RuntimeError(f"transformers >= 4.50 is required, found {transformers.__version__}")
 
     # Device / dtype selection optimized for MacBook Air M4 (MPS)
     use_cuda = torch.cuda.is_available()
@@ -24,62 +56,427 @@ def load_model_and_tokenizer() -> tuple[AutoModelForCausalLM, AutoTokenizer, str
     else:
         chosen_dtype = torch.float32
 
+    # Opt-in weight quantization. "nf4" (bitsandbytes, CUDA only) cuts the weight bytes read per decoded token ~4x
+    # but keeps LoRA unmerged and decode eager; "int8" uses LLM.int8() weights on CUDA and dynamic int8 activation
+    # quantization of the merged Linear layers on CPU. The default keeps merged weights and the compiled decode step.
+    if quantize == "nf4" and not use_cuda:
+        raise ValueError("NF4 quantization requires CUDA (bitsandbytes).")
+    if quantize == "int8" and use_mps:
+        raise ValueError("int8 quantization requires CUDA (bitsandbytes) or CPU; MPS has no int8 matmul kernels.")
+    bnb_quantized = quantize == "nf4" or (quantize == "int8" and use_cuda)
+    quantization_kwargs = {}
+    if bnb_quantized:
+        if quantize == "nf4":
+            quantization_config = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_compute_dtype=chosen_dtype if chosen_dtype != torch.float32 else torch.float16,
+                bnb_4bit_quant_type="nf4",
+            )
+        else:
+            quantization_config = BitsAndBytesConfig(load_in_8bit=True)
+        quantization_kwargs = {
+            "quantization_config": quantization_config,
+            # bitsandbytes places the quantized weights; keep everything on the one GPU
+            "device_map": {"": torch.cuda.current_device()},
+        }
+
     # Tokenizer
-    tokenizer = AutoTokenizer.from_pretrained(base_model_id, trust_remote_code=True)
+    tokenizer = AutoTokenizer.from_pretrained(base_model_id)
     if tokenizer.pad_token is None:
         tokenizer.pad_token = tokenizer.eos_token
 
-    # Base model — avoid device_map on MPS to prevent CPU fallback; use eager attention
+    # Fused SDPA attention (Metal on MPS, FlashAttention/mem-efficient kernels on CUDA) when torch provides it
+    attn_implementation = "sdpa" if hasattr(torch.nn.functional, "scaled_dot_product_attention") else "eager"
+    if use_cuda:
+        torch.backends.cuda.enable_flash_sdp(True)
+        torch.backends.cuda.enable_mem_efficient_sdp(True)
+
+    # Reuse adapters pre-merged to disk unless they are older than the adapter weights (or bitsandbytes quantizes)
+    adapter_weights = adapters_dir / "adapter_model.safetensors"
+    if not adapter_weights.exists():
+        # PEFT would fall back to adapter_model.bin, which is unpickled into RAM instead of mmapped
+        raise FileNotFoundError(f"Adapter weights not found at {adapter_weights} (safetensors required)")
+    merged_config = merged_dir / "config.json"
+    use_merged = (
+        not bnb_quantized
+        and merged_config.exists()
+        and merged_config.stat().st_mtime >= adapter_weights.stat().st_mtime
+    )
+    model_source = str(merged_dir) if use_merged else base_model_id
+
+    # Start pulling local weight files into the page cache before from_pretrained mmaps them
+    prefetch_weight_files(merged_dir if use_merged else adapters_dir)
+
+    # Base model — avoid device_map on MPS to prevent CPU fallback
     try:
         model = AutoModelForCausalLM.from_pretrained(
-            base_model_id,
+            model_source,
             torch_dtype=chosen_dtype,
             low_cpu_mem_usage=True,
-            attn_implementation="eager",
-            trust_remote_code=True,
+            use_safetensors=True,
+            attn_implementation=attn_implementation,
+            **quantization_kwargs,
         )
-    except Exception as exc:  # As a last resort, drop to float32
-        print(f"[inference] Warning loading in {chosen_dtype}: {exc}. Falling back to float32.", file=sys.stderr)
+    except Exception as exc:  # As a last resort, retry with eager attention (fp16 on MPS, float32 elsewhere)
+        # fp32 on MPS would double weight bytes for a memory-bound decode; keep half precision there
+        chosen_dtype = torch.float16 if use_mps else torch.float32
+        print(f"[inference] Warning loading model: {exc}. Falling back to {chosen_dtype}.", file=sys.stderr)
         model = AutoModelForCausalLM.from_pretrained(
-            base_model_id,
-            torch_dtype=torch.float32,
+            model_source,
+            torch_dtype=chosen_dtype,
             low_cpu_mem_usage=True,
+            use_safetensors=True,
             attn_implementation="eager",
-            trust_remote_code=True,
+            **quantization_kwargs,
         )
+    # Record the loaded dtype so HF internals don't upcast hidden states
+    model.config.torch_dtype = chosen_dtype
 
-    model = model.to(device)
+    # Phi-3 is native in transformers >= 4.41; remote modeling code would bypass the SDPA/StaticCache/compile paths
+    if not type(model).__module__.startswith("transformers.models.phi3"):
+        print(f"[inference] Warning: expected native Phi-3 modeling, got {type(model).__module__}", file=sys.stderr)
 
-    # Load PEFT adapter and merge into the base model for inference
-    peft_wrapped = PeftModel.from_pretrained(model, str(adapters_dir))
-    model = peft_wrapped.merge_and_unload()
+    if bnb_quantized:
+        # Adapters cannot be merged into 4/8-bit weights, so a quantized base keeps LoRA as an unmerged residual path
+        model = PeftModel.from_pretrained(model, str(adapters_dir))
+    else:
+        if not use_merged:
+            # One-time merge on CPU in float32 (single rounding to the target dtype), persisted for later runs
+            print(f"[inference] Merging adapters into {merged_dir} (one-time)", file=sys.stderr)
+            peft_wrapped = PeftModel.from_pretrained(model.float(), str(adapters_dir))
+            model = peft_wrapped.merge_and_unload().to(chosen_dtype)
+            # Merged W + BA can keep strided views from the LoRA unpack path; store row-major so matmuls
+            # dispatch straight to cuBLAS/MPS kernels without an implicit copy per layer per token
+            for param in model.parameters():
+                if not param.data.is_contiguous():
+                    param.data = param.data.contiguous()
+            # save_pretrained writes config.json before the shards; build the copy beside the target and rename it
+            # into place only once complete, so an interrupted merge never leaves a "fresh" config over partial weights
+            staging_dir = merged_dir.with_name(merged_dir.name + ".tmp")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            model.save_pretrained(str(staging_dir), safe_serialization=True)
+            shutil.rmtree(merged_dir, ignore_errors=True)
+            os.replace(staging_dir, merged_dir)
+        model = model.to(device)
+        if quantize == "int8":
+            # CPU: int8 weights with per-step int8 activations for every Linear; norms and embeddings stay float
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    # Native Phi-3 computes RoPE cos/sin once per forward (shared by every layer) in fp32 from inv_freq, with no
+    # length-bound table to pre-size. Casting the model to half precision (the merge path's .to(dtype)) also casts
+    # that buffer, so rebuild it in fp32 on the device to keep positions exact.
+    for module in model.modules():
+        if isinstance(module, Phi3RotaryEmbedding) and module.inv_freq.dtype != torch.float32:
+            inv_freq, _ = module.rope_init_fn(module.config, module.inv_freq.device)
+            module.inv_freq = inv_freq
+            module.original_inv_freq = inv_freq
+
+    # Phi-3 projects Q/K/V and gate/up with single fused GEMMs (qkv_proj, gate_up_proj), and the merge above folds
+    # LoRA deltas into those same matrices; flag any checkpoint that would fall back to separate projections
+    module_names = {name.rsplit(".", 1)[-1] for name, _ in model.named_modules()}
+    if not {"qkv_proj", "gate_up_proj"} <= module_names:
+        print("[inference] Warning: model does not use fused qkv_proj/gate_up_proj projections", file=sys.stderr)
 
     model.eval()
-    # Disable KV cache to avoid DynamicCache API mismatches across transformers versions
-    model.config.use_cache = False
     if getattr(model.config, "pad_token_id", None) is None:
         model.config.pad_token_id = tokenizer.pad_token_id
 
-    return model, tokenizer, device
+    # Pre-allocated KV cache reused across prompts (reset between generations)
+    cache = build_static_cache(model, max_cache_len=512)
+
+    # Capture the decode step as a CUDA graph on CUDA; inductor on MPS is immature. greedy_generate() compiles
+    # only the fixed-shape (1-token) decode forward with these options, so KV tensors sit at fixed addresses and
+    # each step is a single graph replay, while variable-length prefill stays eager (no per-prompt-length
+    # recompiles). Quantized+PEFT stays eager.
+    if use_cuda and quantize == "none":
+        model.generation_config.compile_config = CompileConfig(fullgraph=False, dynamic=False, mode="reduce-overhead")
+        # Warm up through the REPL's own decode loop and cache so compilation and graph capture see the exact
+        # call signature of real prompts. No drafts and no stop ids: every step is a compiled single-token step.
+        warmup_ids = tokenizer(build_phi3_prompt("Warm up"), add_special_tokens=False, return_tensors="pt")
+        with torch.inference_mode():
+            greedy_generate(
+                model,
+                warmup_ids["input_ids"].to(device),
+                cache,
+                max_new_tokens=4,
+                stop_token_ids=[],
+                prompt_lookup_num_tokens=0,
+            )
+        cache.reset()
+
+    return model, tokenizer, device, cache
+
+
+def prefetch_weight_files(directory: Path) -> None:
+    # Linux-only readahead hint (POSIX_FADV_WILLNEED); safetensors then mmaps pages that are already resident
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for weights_file in directory.glob("*.safetensors"):
+        fd = os.open(weights_file, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+def build_static_cache(model: AutoModelForCausalLM, max_cache_len: int) -> StaticCache:
+    # Fixed-size KV cache so decode steps reuse keys/values instead of recomputing attention over the prompt
+    return StaticCache(
+        config=model.config,
+        max_batch_size=1,
+        max_cache_len=max_cache_len,
+        device=model.device,
+        dtype=model.dtype,
+    )
+
+
+class BufferedTextStreamer(TextStreamer):
+    # TextStreamer re-decodes its whole token cache on every put(); buffer new ids and decode every N tokens
+    def __init__(self, tokenizer: AutoTokenizer, flush_every: int = 8, **kwargs) -> None:
+        super().__init__(tokenizer, **kwargs)
+        self.flush_every = flush_every
+        self.pending_ids: list[int] = []
+        self.pending_text = ""
+
+    def put(self, value: torch.Tensor) -> None:
+        if self.skip_prompt and self.next_tokens_are_prompt:
+            super().put(value)  # Consumes (skips) the prompt
+            return
+        self.pending_ids.extend(value.reshape(-1).tolist())
+        if len(self.pending_ids) >= self.flush_every:
+            self._flush_pending()
+
+    def end(self) -> None:
+        self._flush_pending()
+        super().end()
+
+    def _flush_pending(self) -> None:
+        if self.pending_ids:
+            super().put(torch.tensor(self.pending_ids))
+            self.pending_ids = []
+
+    def on_finalized_text(self, text: str, stream_end: bool = False) -> None:
+        # TextStreamer prints with flush=True per chunk; write (and flush) only once a chunk completes a word, so the
+        # 8-token decode batches reach the terminal in ~1/8 as many flushes while one-line replies still stream
+        self.pending_text += text
+        if stream_end:
+            sys.stdout.write(self.pending_text + "\n")
+            self.pending_text = ""
+            sys.stdout.flush()
+        elif any(char.isspace() for char in text):
+            sys.stdout.write(self.pending_text)
+            self.pending_text = ""
+            sys.stdout.flush()
+
+
+def prompt_lookup_draft(token_ids: list[int], num_tokens: int, max_ngram_size: int = 2) -> list[int]:
+    # N-gram speculation: find the latest earlier occurrence of the trailing n-gram and propose what followed it
+    for ngram_size in range(min(max_ngram_size, len(token_ids) - 1), 0, -1):
+        ngram = token_ids[-ngram_size:]
+        for start in range(len(token_ids) - ngram_size - 1, -1, -1):
+            if token_ids[start : start + ngram_size] == ngram:
+                return token_ids[start + ngram_size : start + ngram_size + num_tokens]
+    return []
+
+
+def greedy_generate(
+    model: AutoModelForCausalLM,
+    input_ids: torch.Tensor,
+    cache: StaticCache,
+    max_new_tokens: int,
+    stop_token_ids: list[int],
+    streamer: TextStreamer | None = None,
+    prompt_lookup_num_tokens: int = 10,
+) -> torch.Tensor:
+    # Plain argmax loop over the static cache: no logits processors or stopping-criteria lists per step.
+    # Prefill runs eagerly; single-token decode steps go through the compiled call when compile_config is set.
+    # Chosen ids are already host ints (drafts need them), so stopping is a set lookup rather than a device op.
+    stop_tokens = frozenset(stop_token_ids)
+    compile_config = model.generation_config.compile_config
+    decode_forward = model.get_compiled_call(compile_config) if compile_config is not None else model
+    if streamer is not None:
+        streamer.put(input_ids.cpu())
+
+    history = input_ids[0].tolist()
+    cache_position = torch.arange(len(history), device=input_ids.device)
+    # Only the last position's logits are needed from the prefill
+    logits = model(
+        input_ids, past_key_values=cache, cache_position=cache_position, use_cache=True, logits_to_keep=1
+    ).logits
+    # Tokens chosen since the last forward; all but the last one are already in the KV cache
+    pending = [int(logits[0, -1].argmax())]
+    # CUDA: page-locked staging buffers so step ids and predictions cross the bus as async DMA copies
+    use_pinned = input_ids.is_cuda
+    if use_pinned:
+        step_staging = torch.empty(prompt_lookup_num_tokens + 1, dtype=torch.long, pin_memory=True)
+        predicted_staging = torch.empty(prompt_lookup_num_tokens + 1, dtype=torch.long, pin_memory=True)
+    generated: list[int] = []
+    while True:
+        finished = False
+        for index, token in enumerate(pending):
+            if token in stop_tokens or len(generated) + index + 1 >= max_new_tokens:
+                pending = pending[: index + 1]
+                finished = True
+                break
+        generated.extend(pending)
+        history.extend(pending)
+        if finished:
+            if streamer is not None:
+                streamer.put(torch.tensor(pending))
+            break
+
+        # PowerShell replies repeat cmdlet/parameter names from the prompt: draft tokens by n-gram lookup and verify
+        # them in one forward (1 weight read for up to K+1 tokens). Rejected drafts leave stale KV entries past
+        # the current position, which the causal mask hides and the next step overwrites.
+        draft = []
+        if prompt_lookup_num_tokens > 0:
+            draft_budget = min(prompt_lookup_num_tokens, max_new_tokens - len(generated) - 1)
+            draft = prompt_lookup_draft(history, num_tokens=draft_budget)
+        step_ids = torch.tensor([history[-1], *draft])
+        if use_pinned:
+            step_ids = step_staging[: step_ids.shape[0]].copy_(step_ids)
+        step_ids = step_ids.to(input_ids.device, non_blocking=True).unsqueeze(0)
+        cache_position = torch.arange(len(history) - 1, len(history) + len(draft), device=input_ids.device)
+        # Multi-token verification steps have variable length and stay eager; single-token steps replay the graph
+        forward = model if draft else decode_forward
+        logits = forward(step_ids, past_key_values=cache, cache_position=cache_position, use_cache=True).logits
+        predicted = logits[0].argmax(dim=-1)
+        if use_pinned:
+            predicted = predicted_staging[: predicted.shape[0]].copy_(predicted, non_blocking=True)
+            predicted_ready = torch.cuda.Event()
+            predicted_ready.record()
+        # Detokenize/print the committed tokens on the host while the forward is still queued on the GPU
+        if streamer is not None:
+            streamer.put(torch.tensor(pending))
+        if use_pinned:
+            predicted_ready.synchronize()
+        predicted = predicted.tolist()
+        accepted = 0
+        while accepted < len(draft) and predicted[accepted] == draft[accepted]:
+            accepted += 1
+        pending = draft[:accepted] + [predicted[accepted]]
+
+    if streamer is not None:
+        streamer.end()
+    return torch.tensor([generated], device=input_ids.device)
+
+
+def generate_batch(
+    model: AutoModelForCausalLM,
+    tokenizer: AutoTokenizer,
+    instructions: list[str],
+    max_new_tokens: int = 80,
+    eos_token_ids: list[int] | None = None,
+) -> list[str]:
+    # Scripted multi-prompt evaluation: one batched greedy generate reads the weights once per step for all prompts
+    # Left padding keeps every prompt ending at the last position, where generation continues (this call only)
+    inputs = tokenizer(
+        [build_phi3_prompt(instruction) for instruction in instructions],
+        add_special_tokens=False,
+        padding=True,
+        padding_side="left",
+        return_tensors="pt",
+    ).to(model.device)
+    with torch.inference_mode():
+        output_ids = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            # A list of stop ids is checked for the whole batch with one torch.isin per step
+            eos_token_id=eos_token_ids if eos_token_ids is not None else phi3_stop_token_ids(tokenizer),
+            pad_token_id=tokenizer.pad_token_id,
+        )
+    # Drop the (left-padded) prompt columns; pad/EOS after an early stop are removed as special tokens
+    return tokenizer.batch_decode(output_ids[:, inputs["input_ids"].shape[1] :], skip_special_tokens=True)
+
+
+def phi3_stop_token_ids(tokenizer: AutoTokenizer) -> list[int]:
+    # Stop on Phi-3's <|end|> turn terminator (when the vocabulary has it) as well as EOS
+    end_token_id = tokenizer.convert_tokens_to_ids("<|end|>")
+    stop_token_ids = [tokenizer.eos_token_id]
+    if end_token_id is not None and end_token_id != tokenizer.unk_token_id and end_token_id != tokenizer.eos_token_id:
+        stop_token_ids.insert(0, end_token_id)
+    return stop_token_ids
 
 
 def build_phi3_prompt(instruction: str) -> str:
     # Phi-3 instruct chat format
-    return f"<|user|>\n{instruction}<|end|>\n<|assistant|>\n"
+    return f"{PHI3_USER_PREFIX}{instruction}{PHI3_ASSISTANT_PREFIX}"
+
+
+def start_background_warmup(
+    model: AutoModelForCausalLM, input_ids: torch.Tensor, cache: StaticCache
+) -> threading.Event:
+    # Short greedy_generate on the REPL's StaticCache on a daemon thread, so the prefill and single-token decode
+    # kernels are loaded while the user types the first prompt; the cache is reset afterwards
+    ready = threading.Event()
+
+    def warmup() -> None:
+        try:
+            with torch.inference_mode():
+                greedy_generate(
+                    model, input_ids, cache, max_new_tokens=4, stop_token_ids=[], prompt_lookup_num_tokens=0
+                )
+            cache.reset()
+        except Exception as exc:  # Warmup is best-effort; the first real prompt just pays the cost instead
+            print(f"[inference] Warmup skipped: {exc}", file=sys.stderr)
+        finally:
+            ready.set()
+
+    threading.Thread(target=warmup, name="inference-warmup", daemon=True).start()
+    return ready
 
 
 def main() -> None:
-    model, tokenizer, device = load_model_and_tokenizer()
+    parser = argparse.ArgumentParser(description="Interactive Phi-3 PowerShell assistant")
+    parser.add_argument(
+        "--quantize",
+        choices=("none", "nf4", "int8"),
+        default="none",
+        help="Weight quantization: nf4 (CUDA), int8 (CUDA or CPU); default keeps merged half-precision weights",
+    )
+    parser.add_argument(
+        "--batch-file",
+        type=Path,
+        help="Answer each non-empty line of this file as an instruction (batched) instead of starting the REPL",
+    )
+    parser.add_argument("--batch-size", type=int, default=8, help="Instructions per batched generate (--batch-file)")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error(f"--batch-size must be at least 1, got {args.batch_size}")
 
-    # Try to use Phi-3 specific end token if available
-    end_token_id = tokenizer.convert_tokens_to_ids("<|end|>")
-    if end_token_id == tokenizer.unk_token_id or end_token_id is None:
-        end_token_id = tokenizer.eos_token_id
+    model, tokenizer, device, cache = load_model_and_tokenizer(quantize=args.quantize)
+    max_new_tokens = 80
+
+    if args.batch_file is not None:
+        instructions = [line.strip() for line in args.batch_file.read_text(encoding="utf-8").splitlines()]
+        instructions = [instruction for instruction in instructions if instruction]
+        for start in range(0, len(instructions), args.batch_size):
+            chunk = instructions[start : start + args.batch_size]
+            replies = generate_batch(model, tokenizer, chunk, max_new_tokens=max_new_tokens)
+            for instruction, reply in zip(chunk, replies):
+                print(f"Instruction> {instruction}\n{reply.strip()}\n")
+        return
+
+    stop_token_ids = phi3_stop_token_ids(tokenizer)
+
+    # Tokenize the chat scaffolding once and keep it on device; each turn only tokenizes the instruction
+    prefix_ids = tokenizer(PHI3_USER_PREFIX, add_special_tokens=False, return_tensors="pt")["input_ids"].to(device)
+    suffix_ids = tokenizer(PHI3_ASSISTANT_PREFIX, add_special_tokens=False, return_tensors="pt")["input_ids"].to(device)
+
+    # Prewarm kernels in the background; generation waits on it so the model is never used from two threads at once.
+    # The compiled CUDA path was already warmed synchronously by load_model_and_tokenizer().
+    if model.generation_config.compile_config is None:
+        warmup_ready = start_background_warmup(model, torch.cat([prefix_ids, suffix_ids], dim=1), cache)
+    else:
+        warmup_ready = threading.Event()
+        warmup_ready.set()
+    read_instruction = PromptSession().prompt if PromptSession is not None else input
 
     print("Interactive Phi-3 (PEFT adapters merged, optimized for Apple Silicon). Type 'quit' to exit.\n")
     while True:
         try:
-            instruction = input("Instruction> ").strip()
+            instruction = read_instruction("Instruction> ").strip()
         except (EOFError, KeyboardInterrupt):
             print()
             break
@@ -89,20 +486,32 @@ def main() -> None:
         if not instruction:
             continue
 
-        prompt = build_phi3_prompt(instruction)
-        inputs = tokenizer(prompt, return_tensors="pt")
-        inputs = {k: v.to(device) for k, v in inputs.items()}
+        # Pinned host ids copy to CUDA asynchronously; single unpadded sequence, so no attention mask is needed
+        body_ids = tokenizer(instruction, add_special_tokens=False, return_tensors="pt")["input_ids"]
+        # Host-only work above; every device op below waits until the warmup thread is done with the model
+        warmup_ready.wait()
+        if device == "cuda":
+            body_ids = body_ids.pin_memory()
+        body_ids = body_ids.to(device, non_blocking=True)
+        input_ids = torch.cat([prefix_ids, body_ids, suffix_ids], dim=1)
+
+        # Reuse the static cache; grow it only when this prompt plus the reply would not fit
+        needed_len = input_ids.shape[1] + max_new_tokens
+        if needed_len > cache.max_cache_len:
+            cache = build_static_cache(model, max_cache_len=needed_len)
+        else:
+            cache.reset()
 
         # Stream tokens to avoid feeling "stuck" during generation on MPS
-        streamer = TextStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        streamer = BufferedTextStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
         with torch.inference_mode():
-            _ = model.generate(
-                **inputs,
-                max_new_tokens=80,
-                do_sample=False,  # greedy for speed/stability on MPS
-                eos_token_id=end_token_id,
-                pad_token_id=tokenizer.pad_token_id,
-                use_cache=False,
+            # Greedy for speed/stability on MPS
+            _ = greedy_generate(
+                model,
+                input_ids,
+                cache,
+                max_new_tokens=max_new_tokens,
+                stop_token_ids=stop_token_ids,
                 streamer=streamer,
             )
         print("\n")